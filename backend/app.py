@@ -1,33 +1,155 @@
-from flask import Flask, jsonify
-from flask_cors import CORS
-from flask_socketio import SocketIO
-import os
-import logging
-from datetime import datetime
-
-from routes.upload import upload_bp
-from routes.replay import replay_bp
-from routes.system import system_bp
-from routes.logs import logs_bp, setup_log_websocket_handlers
-from utils.logger import setup_logger
-from services.log_service import get_log_streamer
-from config import Config
+# When run directly (dev entry), monkey-patch before anything else is
+# imported, mirroring wsgi.py: SocketIO runs in gevent mode, and the
+# background threads (emit loop, log listener, analysis executor) must
+# be cooperative greenlets rather than native threads under its hub
+if __name__ == '__main__':
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Flask, jsonify, request, Response  # noqa: E402
+from flask.json.provider import JSONProvider  # noqa: E402
+from flask_socketio import SocketIO  # noqa: E402
+import orjson  # noqa: E402
+import os  # noqa: E402
+import logging  # noqa: E402
+from datetime import datetime  # noqa: E402
+
+from routes.upload import upload_bp  # noqa: E402
+from routes.replay import replay_bp  # noqa: E402
+from routes.system import system_bp  # noqa: E402
+from routes.logs import logs_bp, setup_log_websocket_handlers  # noqa: E402
+from utils.logger import setup_logger  # noqa: E402
+from services.log_service import get_log_streamer  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def _read_version():
+    """Read the application version from the VERSION file.
+
+    The file only changes on deploy, so this runs once at import time
+    instead of stat-ing up to four paths on every /api/version request.
+    """
+    # Try multiple possible locations for VERSION file
+    possible_paths = [
+        # In Docker container, VERSION is copied to /app
+        'VERSION',
+        # From current working directory
+        os.path.join(os.getcwd(), 'VERSION'),
+        # From backend directory, go up one level to project root
+        os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), 'VERSION'
+        ),
+        # From project root (assuming we're in backend subdirectory)
+        os.path.join(os.path.dirname(os.getcwd()), 'VERSION'),
+    ]
+
+    # Use a named logger: the module-level logging.info/warning helpers
+    # would auto-install a default root handler at import time, before
+    # setup_logger() gets to configure logging
+    logger = logging.getLogger(__name__)
+
+    for version_file in possible_paths:
+        if os.path.exists(version_file):
+            with open(version_file, 'r') as f:
+                version = f.read().strip()
+            logger.info(f"Found VERSION file at: {version_file}")
+            return version
+
+    logger.warning(
+        f"VERSION file not found. Tried paths: {possible_paths}"
+    )
+    return '1.2.1'  # default to current version
+
+
+APP_VERSION = _read_version()
+
+# Prebuilt body for /api/status; only the timestamp varies per request
+_STATUS_PREFIX = (
+    b'{"status":"healthy","version":"' + APP_VERSION.encode() +
+    b'","name":"PCAP Replaya","timestamp":"'
+)
+_STATUS_SUFFIX = b'"}'
+
+# Static wildcard CORS headers; cheaper than flask-cors, which parses
+# the Origin header and rebuilds the header set on every response
+_CORS_HEADERS = (
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET,POST,PUT,DELETE,OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type,Authorization'),
+)
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson's C serializer.
+
+    Makes every jsonify() call use orjson instead of the stdlib json
+    module; serialization dominates for large payloads like
+    /logs/recent and /replay/history.
+    """
+
+    def dumps(self, obj, **kwargs):
+        # default=str matches the json.dumps(..., default=str) fallback
+        # used elsewhere in the codebase
+        return orjson.dumps(obj, default=str).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+class OrjsonFlask(Flask):
+    json_provider_class = OrjsonProvider
+
+
+class OrjsonSocketIOJson:
+    """json-module shim so python-socketio packets encode via orjson.
+
+    python-socketio accepts any object with dumps/loads in place of the
+    json module; this routes every emit payload (the log stream being
+    the hot one) through orjson's C encoder. Extra stdlib-json keyword
+    arguments like separators are accepted and ignored.
+    """
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        return orjson.dumps(obj, default=str).decode()
+
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return orjson.loads(s)
 
 
 def create_app():
-    app = Flask(__name__)
+    app = OrjsonFlask(__name__)
     app.config.from_object(Config)
     
     # Set longer timeout for large file uploads
     app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
     
-    # Enable CORS for all routes
-    CORS(app, origins=["*"])
+    # Enable CORS for all routes with static wildcard headers
+    @app.before_request
+    def cors_preflight():
+        if request.method == 'OPTIONS':
+            return ('', 204)
+
+    # Reject oversize uploads before any body bytes are consumed;
+    # MAX_CONTENT_LENGTH alone only aborts after Werkzeug starts reading
+    @app.before_request
+    def reject_oversize_request():
+        content_length = request.content_length
+        if content_length and content_length > app.config['MAX_CONTENT_LENGTH']:
+            return jsonify({'error': 'File too large. Maximum size is 1GB.'}), 413
+
+    @app.after_request
+    def cors_headers(response):
+        response.headers.extend(_CORS_HEADERS)
+        return response
     
     # Initialize SocketIO with better error handling
     socketio = SocketIO(
-        app, 
+        app,
+        async_mode='gevent',  # gevent WSGI instead of threading/Werkzeug
         cors_allowed_origins="*",
+        json=OrjsonSocketIOJson,
         logger=False,  # Disable SocketIO's own logging to prevent conflicts
         engineio_logger=False,
         ping_timeout=60,
@@ -53,6 +175,20 @@ def create_app():
     log_streamer = get_log_streamer()
     log_streamer.start_streaming(socketio)
     
+    @app.route('/api/status')
+    def get_status():
+        """Get combined health and version status.
+
+        Orchestrators and the UI poll health and version in lockstep;
+        this serves both from a prebuilt byte template with only the
+        timestamp spliced in per request.
+        """
+        return Response(
+            _STATUS_PREFIX + datetime.utcnow().isoformat().encode() +
+            _STATUS_SUFFIX,
+            mimetype='application/json'
+        )
+
     @app.route('/api/health')
     def health_check():
         return jsonify({
@@ -63,48 +199,12 @@ def create_app():
     @app.route('/api/version')
     def get_version():
         """Get application version information."""
-        try:
-            # Try multiple possible locations for VERSION file
-            possible_paths = [
-                # In Docker container, VERSION is copied to /app
-                'VERSION',
-                # From current working directory
-                os.path.join(os.getcwd(), 'VERSION'),
-                # From backend directory, go up one level to project root
-                os.path.join(
-                    os.path.dirname(os.path.dirname(__file__)), 'VERSION'
-                ),
-                # From project root (assuming we're in backend subdirectory)
-                os.path.join(os.path.dirname(os.getcwd()), 'VERSION'),
-            ]
-            
-            version = '1.2.1'  # default to current version
-            
-            for version_file in possible_paths:
-                if os.path.exists(version_file):
-                    with open(version_file, 'r') as f:
-                        version = f.read().strip()
-                    logging.info(f"Found VERSION file at: {version_file}")
-                    break
-            else:
-                logging.warning(
-                    f"VERSION file not found. Tried paths: {possible_paths}"
-                )
-            
-            return jsonify({
-                'version': version,
-                'name': 'PCAP Replaya',
-                'description': 'Network Packet Replay Tool',
-                'timestamp': datetime.utcnow().isoformat()
-            })
-        except Exception as e:
-            logging.error(f"Error reading version: {e}")
-            return jsonify({
-                'version': '1.2.1',
-                'name': 'PCAP Replaya',
-                'description': 'Network Packet Replay Tool',
-                'timestamp': datetime.utcnow().isoformat()
-            })
+        return jsonify({
+            'version': APP_VERSION,
+            'name': 'PCAP Replaya',
+            'description': 'Network Packet Replay Tool',
+            'timestamp': datetime.utcnow().isoformat()
+        })
     
     @app.errorhandler(413)
     def too_large(e):
@@ -119,17 +219,12 @@ def create_app():
 
 
 if __name__ == '__main__':
+    # Development entry point; production uses wsgi.py under gunicorn
+    # with the gevent WebSocket worker.
     app, socketio = create_app()
-    
+
     # Ensure upload directory exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    
-    # Run the application
-    # Use allow_unsafe_werkzeug=True for production or disable debug
-    is_production = os.environ.get('FLASK_ENV') == 'production'
-    if is_production:
-        socketio.run(app, host='0.0.0.0', port=5000, debug=False,
-                     allow_unsafe_werkzeug=True)
-    else:
-        socketio.run(app, host='0.0.0.0', port=5000, debug=False,
-                     allow_unsafe_werkzeug=True)
+
+    # Run the application on the gevent server
+    socketio.run(app, host='0.0.0.0', port=5000, debug=False)
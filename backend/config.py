@@ -19,6 +19,8 @@ class Config:
     # Logging
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
     LOG_FILE = os.environ.get('LOG_FILE') or '/var/log/pcap_replaya.log'
+    LOG_BATCH_INTERVAL_MS = 50  # Coalescing window for WebSocket log batches
+    LOG_BATCH_MAX = 140         # Max log entries per 'log_batch' emit
     
     # Network interface settings
     INTERFACE_REFRESH_INTERVAL = 30  # seconds
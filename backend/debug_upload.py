@@ -9,24 +9,32 @@ from services.pcap_service import analyze_pcap_file, get_pcap_summary
 from utils.validators import validate_pcap_file
 from config import Config
 
-# Setup logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+# Setup logging; default to INFO so DEBUG-level formatting (including
+# scapy's per-packet output) is skipped entirely unless requested
+logging.basicConfig(
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
 
 def debug_pcap_file(file_path):
     """Debug a PCAP file upload process"""
     print(f"=== Debugging PCAP file: {file_path} ===")
-    
+
     # Check if file exists
     if not os.path.exists(file_path):
         print(f"ERROR: File does not exist: {file_path}")
         return False
-    
-    # Get file size
+
+    # Get file size (lazy %-formatting: skipped when DEBUG is disabled)
     file_size = os.path.getsize(file_path)
-    print(f"File size: {file_size} bytes ({file_size / (1024*1024):.2f} MB)")
-    
+    logger.debug("File size: %s bytes (%.2f MB)",
+                 file_size, file_size / (1024 * 1024))
+
     # Check against config limits
-    print(f"Max allowed size: {Config.MAX_CONTENT_LENGTH} bytes ({Config.MAX_CONTENT_LENGTH / (1024*1024*1024):.2f} GB)")
+    logger.debug("Max allowed size: %s bytes (%.2f GB)",
+                 Config.MAX_CONTENT_LENGTH,
+                 Config.MAX_CONTENT_LENGTH / (1024 * 1024 * 1024))
     if file_size > Config.MAX_CONTENT_LENGTH:
         print(f"ERROR: File exceeds maximum size limit")
         return False
@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response
 from flask_socketio import emit, join_room, leave_room
 import logging
 from services.log_service import get_log_streamer
@@ -6,6 +6,24 @@ from services.log_service import get_log_streamer
 logs_bp = Blueprint('logs', __name__)
 logger = logging.getLogger(__name__)
 
+# Fixed subscription status payloads; built once instead of per event
+_SUBSCRIBED = {
+    'status': 'subscribed',
+    'message': 'Successfully subscribed to log stream'
+}
+_UNSUBSCRIBED = {
+    'status': 'unsubscribed',
+    'message': 'Successfully unsubscribed from log stream'
+}
+_SUBSCRIBE_ERROR = {
+    'status': 'error',
+    'message': 'Failed to subscribe to log stream'
+}
+_UNSUBSCRIBE_ERROR = {
+    'status': 'error',
+    'message': 'Failed to unsubscribe from log stream'
+}
+
 
 @logs_bp.route('/logs/recent', methods=['GET'])
 def get_recent_logs():
@@ -13,14 +31,11 @@ def get_recent_logs():
     try:
         count = request.args.get('count', 100, type=int)
         count = min(count, 500)  # Limit to 500 logs max
-        
+
         log_streamer = get_log_streamer()
-        logs = log_streamer.get_recent_logs(count)
-        
-        return jsonify({
-            'logs': logs,
-            'count': len(logs)
-        })
+        payload = log_streamer.get_recent_logs_bytes(count)
+
+        return Response(payload, mimetype='application/json')
         
     except Exception as e:
         logger.error(f"Error getting recent logs: {str(e)}")
@@ -54,17 +69,11 @@ def setup_log_websocket_handlers(socketio):
             log_streamer = get_log_streamer()
             log_streamer.add_client(client_id)
             
-            emit('log_subscription_status', {
-                'status': 'subscribed',
-                'message': 'Successfully subscribed to log stream'
-            })
-            
+            emit('log_subscription_status', _SUBSCRIBED)
+
         except Exception as e:
             logger.error(f"Error subscribing to logs: {str(e)}")
-            emit('log_subscription_status', {
-                'status': 'error',
-                'message': 'Failed to subscribe to log stream'
-            })
+            emit('log_subscription_status', _SUBSCRIBE_ERROR)
     
     @socketio.on('unsubscribe_logs')
     def handle_unsubscribe_logs():
@@ -76,17 +85,11 @@ def setup_log_websocket_handlers(socketio):
             log_streamer = get_log_streamer()
             log_streamer.remove_client(client_id)
             
-            emit('log_subscription_status', {
-                'status': 'unsubscribed',
-                'message': 'Successfully unsubscribed from log stream'
-            })
-            
+            emit('log_subscription_status', _UNSUBSCRIBED)
+
         except Exception as e:
             logger.error(f"Error unsubscribing from logs: {str(e)}")
-            emit('log_subscription_status', {
-                'status': 'error',
-                'message': 'Failed to unsubscribe from log stream'
-            })
+            emit('log_subscription_status', _UNSUBSCRIBE_ERROR)
     
     @socketio.on('disconnect')
     def handle_disconnect():
@@ -5,8 +5,10 @@ from datetime import datetime
 
 from utils.validators import validate_replay_config
 from utils.logger import log_replay_event
+from utils.http import conditional_json
 from services.replay_service import ReplayManager
 from services.history_service import get_history_service
+from services.file_index import get_upload_path
 
 replay_bp = Blueprint('replay', __name__)
 
@@ -32,15 +34,9 @@ def start_replay():
         if not file_id:
             return jsonify({'error': 'File ID is required'}), 400
         
-        # Find the uploaded file
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        file_path = None
-        for filename in os.listdir(upload_folder):
-            if filename.startswith(f"{file_id}_"):
-                file_path = os.path.join(upload_folder, filename)
-                break
-        
-        if not file_path or not os.path.exists(file_path):
+        # Find the uploaded file via the O(1) file-id index
+        file_path = get_upload_path(file_id)
+        if not file_path:
             return jsonify({'error': 'File not found'}), 404
         
         # Check if replay is already running
@@ -60,9 +56,11 @@ def start_replay():
         # Add to history
         history_service = get_history_service()
         filename = os.path.basename(file_path)
-        file_size = (
-            os.path.getsize(file_path) if os.path.exists(file_path) else 0
-        )
+        # One stat call instead of separate exists + getsize checks
+        try:
+            file_size = os.stat(file_path).st_size
+        except OSError:
+            file_size = 0
         
         history_service.add_replay({
             'filename': filename,
@@ -149,15 +147,14 @@ def get_replay_history():
         search = request.args.get('search', None, type=str)
         status = request.args.get('status', None, type=str)
         
-        # Validate parameters
-        if limit < 1 or limit > 100:
-            limit = 20
-        if offset < 0:
-            offset = 0
+        # Clamp parameters so a hostile limit/offset can't force huge
+        # list copies or JSON payloads
+        limit = max(1, min(limit, 100))
+        offset = max(0, offset)
             
         result = history_service.get_history(limit, offset, search, status)
-        
-        return jsonify({
+
+        return conditional_json(jsonify({
             'history': result['history'],
             'total_count': result['total_count'],
             'limit': result['limit'],
@@ -170,7 +167,7 @@ def get_replay_history():
                 f'Retrieved {len(result["history"])} of '
                 f'{result["total_count"]} replay history entries'
             )
-        }), 200
+        }))
         
     except Exception as e:
         logging.error(f"Error getting replay history: {str(e)}")
@@ -1,29 +1,109 @@
 from flask import Blueprint, jsonify
 import psutil
 import subprocess
+import threading
+import time
 import logging
 from datetime import datetime
 
 from utils.logger import log_replay_event
+from utils.http import conditional_json
 
 system_bp = Blueprint('system', __name__)
 
+# tcpreplay probe cache: fork+exec costs milliseconds per call and the
+# answer almost never changes, so probe at most once per TTL
+_TCPREPLAY_PROBE_TTL = 60.0
+_tcpreplay_probe = {'ts': 0.0, 'data': None}
+_tcpreplay_probe_lock = threading.Lock()
+
+
+# Interface list cache: psutil enumeration walks the kernel interface
+# tables on every call and interfaces rarely change
+_IFACE_CACHE_TTL = 3.0
+_iface_cache = {'ts': 0.0, 'result': None}
+_iface_cache_lock = threading.Lock()
+
+# Loopback interfaces to skip (exact match, not startswith, so names
+# merely beginning with "lo" are not dropped by accident)
+_LOOPBACK_NAMES = {'lo', 'lo0'}
+
+_ADDRESS_FAMILIES = frozenset(('AF_INET', 'AF_INET6'))
+
+
+def _probe_tcpreplay():
+    """Probe tcpreplay availability, version and supported options.
+
+    Returns a dict with 'available', 'version' and 'features' keys; the
+    result is cached for _TCPREPLAY_PROBE_TTL seconds.
+    """
+    now = time.monotonic()
+    with _tcpreplay_probe_lock:
+        cached = _tcpreplay_probe['data']
+        if cached is not None and now - _tcpreplay_probe['ts'] < _TCPREPLAY_PROBE_TTL:
+            return cached
+
+    data = {'available': False, 'version': None, 'features': {}}
+    try:
+        # Check version
+        result = subprocess.run(
+            ['tcpreplay', '--version'],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        if result.returncode == 0:
+            data['available'] = True
+            version_line = result.stdout.split('\n')[0]
+            data['version'] = version_line.split()[-1] if version_line else 'unknown'
+
+        # Check help for available options
+        help_result = subprocess.run(
+            ['tcpreplay', '--help'],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        if help_result.returncode == 0:
+            help_text = help_result.stdout.lower()
+            data['features'] = {
+                'mbps_control': '--mbps' in help_text,
+                'pps_control': '--pps' in help_text,
+                'multiplier_control': '--multiplier' in help_text,
+                'loop_support': '--loop' in help_text
+            }
+
+    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError) as e:
+        logging.warning(f"Could not check tcpreplay capabilities: {str(e)}")
+
+    with _tcpreplay_probe_lock:
+        _tcpreplay_probe['ts'] = now
+        _tcpreplay_probe['data'] = data
+    return data
+
 
 @system_bp.route('/interfaces', methods=['GET'])
 def get_network_interfaces():
     """Get list of available network interfaces."""
     try:
+        # Serve from the short-TTL cache when fresh
+        now = time.monotonic()
+        with _iface_cache_lock:
+            cached = _iface_cache['result']
+            if cached is not None and now - _iface_cache['ts'] < _IFACE_CACHE_TTL:
+                return conditional_json(jsonify(cached))
+
         interfaces = []
-        
+
         # Get network interfaces using psutil
         net_if_addrs = psutil.net_if_addrs()
         net_if_stats = psutil.net_if_stats()
-        
+
         for interface_name, addresses in net_if_addrs.items():
             # Skip loopback interfaces
-            if interface_name.startswith('lo'):
+            if interface_name in _LOOPBACK_NAMES:
                 continue
-                
+
             interface_info = {
                 'name': interface_name,
                 'addresses': [],
@@ -41,7 +121,7 @@ def get_network_interfaces():
             
             # Get IP addresses
             for addr in addresses:
-                if addr.family.name in ['AF_INET', 'AF_INET6']:
+                if addr.family.name in _ADDRESS_FAMILIES:
                     interface_info['addresses'].append({
                         'family': addr.family.name,
                         'address': addr.address,
@@ -52,12 +132,24 @@ def get_network_interfaces():
         
         # Sort interfaces by name
         interfaces.sort(key=lambda x: x['name'])
-        
-        return jsonify({
+
+        result = {
             'interfaces': interfaces,
             'count': len(interfaces),
             'timestamp': datetime.utcnow().isoformat()
-        }), 200
+        }
+
+        with _iface_cache_lock:
+            cached = _iface_cache['result']
+            # Keep the previous payload (and its timestamp) when the
+            # interface list is unchanged, so the ETag stays stable
+            # across cache refreshes and pollers keep getting 304s
+            if cached is not None and cached['interfaces'] == interfaces:
+                result = cached
+            _iface_cache['ts'] = now
+            _iface_cache['result'] = result
+
+        return conditional_json(jsonify(result))
         
     except Exception as e:
         logging.error(f"Error getting network interfaces: {str(e)}")
@@ -77,24 +169,11 @@ def get_system_status():
         # Get disk usage for upload directory
         disk_usage = psutil.disk_usage('/')
         
-        # Check if tcpreplay is available
-        tcpreplay_available = False
-        tcpreplay_version = None
-        try:
-            result = subprocess.run(
-                ['tcpreplay', '--version'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                tcpreplay_available = True
-                # Extract version from output
-                version_line = result.stdout.split('\n')[0]
-                tcpreplay_version = version_line.split()[-1] if version_line else 'unknown'
-        except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
-            pass
-        
+        # Check if tcpreplay is available (cached probe)
+        probe = _probe_tcpreplay()
+
+        # No conditional_json here: cpu/memory/timestamp change on every
+        # call, so an ETag would never match and only add hashing cost
         return jsonify({
             'cpu_percent': cpu_percent,
             'memory': {
@@ -110,12 +189,12 @@ def get_system_status():
                 'percent': (disk_usage.used / disk_usage.total) * 100
             },
             'tcpreplay': {
-                'available': tcpreplay_available,
-                'version': tcpreplay_version
+                'available': probe['available'],
+                'version': probe['version']
             },
             'timestamp': datetime.utcnow().isoformat()
-        }), 200
-        
+        })
+
     except Exception as e:
         logging.error(f"Error getting system status: {str(e)}")
         return jsonify({'error': f'Failed to get system status: {str(e)}'}), 500
@@ -138,39 +217,12 @@ def get_system_capabilities():
             }
         }
         
-        # Check tcpreplay availability and capabilities
-        try:
-            # Check version
-            result = subprocess.run(
-                ['tcpreplay', '--version'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                capabilities['tcpreplay_available'] = True
-                version_line = result.stdout.split('\n')[0]
-                capabilities['tcpreplay_version'] = version_line.split()[-1] if version_line else 'unknown'
-            
-            # Check help for available options
-            help_result = subprocess.run(
-                ['tcpreplay', '--help'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if help_result.returncode == 0:
-                help_text = help_result.stdout.lower()
-                capabilities['features'].update({
-                    'mbps_control': '--mbps' in help_text,
-                    'pps_control': '--pps' in help_text,
-                    'multiplier_control': '--multiplier' in help_text,
-                    'loop_support': '--loop' in help_text
-                })
-                
-        except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError) as e:
-            logging.warning(f"Could not check tcpreplay capabilities: {str(e)}")
-        
+        # Check tcpreplay availability and capabilities (cached probe)
+        probe = _probe_tcpreplay()
+        capabilities['tcpreplay_available'] = probe['available']
+        capabilities['tcpreplay_version'] = probe['version']
+        capabilities['features'].update(probe['features'])
+
         return jsonify(capabilities), 200
         
     except Exception as e:
@@ -1,68 +1,132 @@
 from flask import Blueprint, request, jsonify, current_app, send_file
+import logging
 import os
-import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from werkzeug.utils import secure_filename
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.targets import FileTarget
 
-from utils.validators import validate_pcap_file, sanitize_filename
+from utils.validators import validate_pcap_path, sanitize_filename
 from utils.logger import log_upload_event
-from services.pcap_service import analyze_pcap_file
+from utils.ids import new_id_hex
+from services.pcap_service import analyze_pcap_file, discard_cached_analysis
+from services.file_index import get_file_index
 
 upload_bp = Blueprint('upload', __name__)
 
+# Read the request body in 4 MiB chunks when streaming uploads to disk;
+# large sequential reads keep the copy memory-bandwidth-bound instead of
+# syscall-bound
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# PCAP analysis runs off the request thread so /upload returns as soon
+# as the file is on disk; clients poll /upload/analysis/<file_id>
+_analysis_executor = ThreadPoolExecutor(max_workers=2)
+_analysis_results = {}  # file_id -> {'state': ..., 'pcap_info': ...}
+_analysis_lock = threading.Lock()
+
+
+def _analyze_in_background(file_id, file_path, original_filename):
+    """Run PCAP analysis for an upload and record the result."""
+    try:
+        logging.info(f"Starting PCAP analysis for file: {original_filename}")
+        pcap_info = analyze_pcap_file(file_path)
+        with _analysis_lock:
+            _analysis_results[file_id] = {
+                'state': 'done',
+                'pcap_info': pcap_info
+            }
+        logging.info(f"PCAP analysis completed for file: {original_filename}")
+    except Exception as e:
+        # If analysis fails, the upload is still usable for replay
+        logging.error(f"PCAP analysis failed for {file_path}: {str(e)}")
+        with _analysis_lock:
+            _analysis_results[file_id] = {
+                'state': 'error',
+                'pcap_info': {
+                    'error': f'Analysis failed: {str(e)}',
+                    'packet_count': 'unknown',
+                    'duration': 'unknown',
+                    'file_format': 'unknown'
+                }
+            }
+
 
 @upload_bp.route('/upload', methods=['POST'])
 def upload_file():
-    """Handle PCAP file upload."""
+    """Handle PCAP file upload.
+
+    The multipart body is streamed straight to disk in one pass with
+    streaming-form-data instead of letting Werkzeug spool it through a
+    temporary file and copying it again on save.
+    """
+    temp_path = None
     try:
-        # Check if file is in request
-        if 'file' not in request.files:
+        # A non-multipart POST is a client error; without this check the
+        # streaming parser raises on construction and the generic
+        # handler below would turn it into a 500
+        if request.mimetype != 'multipart/form-data':
             return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
-        
-        # Validate the file
-        is_valid, error_message = validate_pcap_file(file)
+
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        os.makedirs(upload_folder, exist_ok=True)
+
+        # Stream the file part directly into the upload folder
+        unique_id = new_id_hex()
+        temp_path = os.path.join(upload_folder, f"{unique_id}.part")
+        file_target = FileTarget(temp_path)
+        parser = StreamingFormDataParser(headers=request.headers)
+        parser.register('file', file_target)
+
+        stream = request.stream
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.data_received(chunk)
+
+        original_filename = file_target.multipart_filename
+
+        # Validate the streamed file
+        is_valid, error_message = validate_pcap_path(
+            original_filename, temp_path
+        )
         if not is_valid:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
             log_upload_event(
-                filename=file.filename or 'unknown',
+                filename=original_filename or 'unknown',
                 file_size=0,
                 status='validation_failed',
                 error=error_message
             )
             return jsonify({'error': error_message}), 400
-        
-        # Generate unique filename
-        original_filename = file.filename
+
+        # Move into place under the unique filename
         safe_filename = sanitize_filename(original_filename)
-        unique_id = str(uuid.uuid4())
         filename = f"{unique_id}_{safe_filename}"
-        
-        # Save file
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        os.makedirs(upload_folder, exist_ok=True)
         file_path = os.path.join(upload_folder, filename)
-        
-        file.save(file_path)
-        
+        os.replace(temp_path, file_path)
+        temp_path = None
+
+        # Index the file for O(1) lookup by file ID
+        get_file_index().register(unique_id, filename)
+
         # Get file size
         file_size = os.path.getsize(file_path)
         
-        # Analyze PCAP file with timeout protection
-        try:
-            import logging
-            logging.info(f"Starting PCAP analysis for file: {original_filename} ({file_size} bytes)")
-            pcap_info = analyze_pcap_file(file_path)
-            logging.info(f"PCAP analysis completed for file: {original_filename}")
-        except Exception as e:
-            # If analysis fails, still allow upload but with limited info
-            logging.error(f"PCAP analysis failed for {file_path}: {str(e)}")
-            pcap_info = {
-                'error': f'Analysis failed: {str(e)}',
-                'packet_count': 'unknown',
-                'duration': 'unknown',
-                'file_format': 'unknown'
-            }
+        # Kick off PCAP analysis in the background; a multi-GB analysis
+        # would otherwise block this worker for seconds to minutes
+        with _analysis_lock:
+            _analysis_results[unique_id] = {'state': 'pending'}
+        _analysis_executor.submit(
+            _analyze_in_background, unique_id, file_path, original_filename
+        )
+        pcap_info = {
+            'state': 'pending',
+            'poll_url': f'/api/upload/analysis/{unique_id}'
+        }
         
         # Log successful upload
         log_upload_event(
@@ -86,8 +150,10 @@ def upload_file():
         return jsonify(response_data), 200
         
     except Exception as e:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
         log_upload_event(
-            filename=request.files.get('file', {}).filename or 'unknown',
+            filename='unknown',
             file_size=0,
             status='error',
             error=str(e)
@@ -95,28 +161,40 @@ def upload_file():
         return jsonify({'error': f'Upload failed: {str(e)}'}), 500
 
 
+@upload_bp.route('/upload/analysis/<file_id>', methods=['GET'])
+def get_upload_analysis(file_id):
+    """Get the state and result of background PCAP analysis."""
+    with _analysis_lock:
+        result = _analysis_results.get(file_id)
+
+    if result is None:
+        return jsonify({'error': 'No analysis for this file ID'}), 404
+
+    response = {'file_id': file_id, 'state': result['state']}
+    if 'pcap_info' in result:
+        response['pcap_info'] = result['pcap_info']
+    return jsonify(response), 200
+
+
 @upload_bp.route('/upload/status/<file_id>', methods=['GET'])
 def get_upload_status(file_id):
     """Get status of uploaded file."""
     try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        
         # Find file with this ID
-        for filename in os.listdir(upload_folder):
-            if filename.startswith(f"{file_id}_"):
-                file_path = os.path.join(upload_folder, filename)
-                file_size = os.path.getsize(file_path)
-                
-                return jsonify({
-                    'file_id': file_id,
-                    'filename': filename,
-                    'file_size': file_size,
-                    'status': 'ready',
-                    'upload_time': datetime.fromtimestamp(
-                        os.path.getctime(file_path)
-                    ).isoformat()
-                }), 200
-        
+        file_path = get_file_index().lookup(file_id)
+        if file_path:
+            file_size = os.path.getsize(file_path)
+
+            return jsonify({
+                'file_id': file_id,
+                'filename': os.path.basename(file_path),
+                'file_size': file_size,
+                'status': 'ready',
+                'upload_time': datetime.fromtimestamp(
+                    os.path.getctime(file_path)
+                ).isoformat()
+            }), 200
+
         return jsonify({'error': 'File not found'}), 404
         
     except Exception as e:
@@ -127,26 +205,28 @@ def get_upload_status(file_id):
 def cleanup_file(file_id):
     """Clean up uploaded file."""
     try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        
         # Find and delete file with this ID
-        for filename in os.listdir(upload_folder):
-            if filename.startswith(f"{file_id}_"):
-                file_path = os.path.join(upload_folder, filename)
-                os.remove(file_path)
-                
-                log_upload_event(
-                    filename=filename,
-                    file_size=0,
-                    status='deleted',
-                    file_id=file_id
-                )
-                
-                return jsonify({
-                    'message': 'File deleted successfully',
-                    'file_id': file_id
-                }), 200
-        
+        file_index = get_file_index()
+        file_path = file_index.lookup(file_id)
+        if file_path:
+            os.remove(file_path)
+            discard_cached_analysis(file_path)
+            file_index.unregister(file_id)
+            with _analysis_lock:
+                _analysis_results.pop(file_id, None)
+
+            log_upload_event(
+                filename=os.path.basename(file_path),
+                file_size=0,
+                status='deleted',
+                file_id=file_id
+            )
+
+            return jsonify({
+                'message': 'File deleted successfully',
+                'file_id': file_id
+            }), 200
+
         return jsonify({'error': 'File not found'}), 404
         
     except Exception as e:
@@ -157,31 +237,31 @@ def cleanup_file(file_id):
 def download_file(file_id):
     """Download PCAP file by file ID."""
     try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        
         # Find file with this ID
-        for filename in os.listdir(upload_folder):
-            if filename.startswith(f"{file_id}_"):
-                file_path = os.path.join(upload_folder, filename)
-                
-                # Extract original filename (remove UUID prefix)
-                original_filename = filename[37:]  # Remove UUID + underscore
-                
-                # Log download event
-                log_upload_event(
-                    filename=original_filename,
-                    file_size=os.path.getsize(file_path),
-                    status='downloaded',
-                    file_id=file_id
-                )
-                
-                return send_file(
-                    file_path,
-                    as_attachment=True,
-                    download_name=original_filename,
-                    mimetype='application/octet-stream'
-                )
-        
+        file_path = get_file_index().lookup(file_id)
+        if file_path:
+            filename = os.path.basename(file_path)
+
+            # Extract original filename (remove the ID prefix)
+            original_filename = (
+                filename.split('_', 1)[1] if '_' in filename else filename
+            )
+
+            # Log download event
+            log_upload_event(
+                filename=original_filename,
+                file_size=os.path.getsize(file_path),
+                status='downloaded',
+                file_id=file_id
+            )
+
+            return send_file(
+                file_path,
+                as_attachment=True,
+                download_name=original_filename,
+                mimetype='application/octet-stream'
+            )
+
         return jsonify({'error': 'File not found'}), 404
         
     except Exception as e:
@@ -0,0 +1,88 @@
+import os
+import threading
+import logging
+
+from config import Config
+from services.pcap_service import _ANALYSIS_CACHE_SUFFIX
+
+# Named module logger: a bare logging.info at import time would
+# auto-install basicConfig's stderr handler before setup_logger runs
+logger = logging.getLogger(__name__)
+
+
+class FileIndex:
+    """In-memory index mapping upload file IDs to stored filenames.
+
+    Routes used to find uploaded files by scanning the whole upload
+    folder with os.listdir and prefix-matching every entry, which is
+    O(N) syscalls and string scans per request. This index gives O(1)
+    lookups instead. The upload folder itself remains the durable
+    store (each stored filename starts with its file ID), so the index
+    can always be rebuilt from a single directory scan.
+    """
+
+    def __init__(self, upload_folder):
+        self.upload_folder = upload_folder
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def register(self, file_id, filename):
+        """Register a stored filename for a file ID."""
+        with self._lock:
+            self._index[file_id] = filename
+
+    def unregister(self, file_id):
+        """Remove a file ID from the index."""
+        with self._lock:
+            self._index.pop(file_id, None)
+
+    def lookup(self, file_id):
+        """Get the full path for a file ID, or None if not found.
+
+        Falls back to a one-shot directory rescan on a miss so the
+        index self-heals if files were added outside this process.
+        """
+        with self._lock:
+            filename = self._index.get(file_id)
+            if filename is None:
+                self._rescan_locked()
+                filename = self._index.get(file_id)
+
+        if filename is None:
+            return None
+
+        file_path = os.path.join(self.upload_folder, filename)
+        if not os.path.exists(file_path):
+            # Stale entry (file removed outside this process)
+            self.unregister(file_id)
+            return None
+
+        return file_path
+
+    def _rescan_locked(self):
+        """Rebuild the index from the upload folder. Caller holds lock."""
+        try:
+            for entry in os.scandir(self.upload_folder):
+                # Analysis sidecars share the capture's file_id prefix;
+                # indexing one would shadow the capture itself
+                if entry.name.endswith(_ANALYSIS_CACHE_SUFFIX):
+                    continue
+                if '_' in entry.name:
+                    file_id = entry.name.split('_', 1)[0]
+                    self._index.setdefault(file_id, entry.name)
+        except OSError as e:
+            logger.warning(f"Could not scan upload folder: {e}")
+
+
+# Global file index instance
+file_index = FileIndex(Config.UPLOAD_FOLDER)
+
+
+def get_file_index():
+    """Get the global file index instance."""
+    return file_index
+
+
+def get_upload_path(file_id):
+    """Look up the stored path for an uploaded file ID (or None)."""
+    return file_index.lookup(file_id)
@@ -1,51 +1,172 @@
 import json
 import os
 import logging
+import time
+from collections import deque
+from itertools import islice
+
+import orjson
 from datetime import datetime
 from typing import Dict, Optional
-import uuid
+
+from utils.ids import new_id_hex
+
+# Named module logger: a bare logging.info at import time would
+# auto-install basicConfig's stderr handler before setup_logger runs
+logger = logging.getLogger(__name__)
 
 
 class ReplayHistoryService:
-    """Service for managing replay history."""
-    
-    def __init__(self, history_file='replay_history.json'):
+    """Service for managing replay history.
+
+    History is persisted as an append-only JSONL log: adds append the
+    entry, updates append a small update record. This keeps write cost
+    O(change) per replay event instead of rewriting the whole history
+    file each time. The log is compacted back to one line per entry
+    once enough records accumulate.
+    """
+
+    # Rewrite the log after this many appended records
+    COMPACT_THRESHOLD = 500
+
+    # Keep only the most recent entries
+    MAX_ENTRIES = 100
+
+    def __init__(self, history_file='replay_history.jsonl'):
         self.history_file = history_file
-        self.history = []
+        self.history = deque(maxlen=self.MAX_ENTRIES)
+        self._append_count = 0
+        # O(1) lookup indexes, kept in sync with self.history
+        self._by_replay_id = {}
+        self._by_id = {}
+        # Pre-lowercased "filename interface" text per entry id so the
+        # search filter avoids per-request .lower() allocations
+        self._search_lc = {}
         self.load_history()
-    
+
     def load_history(self):
-        """Load history from file."""
+        """Load history by replaying the append-only JSONL log."""
         try:
             if os.path.exists(self.history_file):
-                with open(self.history_file, 'r') as f:
-                    self.history = json.load(f)
-                logging.info(
+                with open(self.history_file, 'rb') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line:
+                            self._apply_record(orjson.loads(line))
+                            self._append_count += 1
+                logger.info(
                     f"Loaded {len(self.history)} replay history entries"
                 )
+            elif os.path.exists('replay_history.json'):
+                # Migrate the legacy full-file JSON store
+                with open('replay_history.json', 'r') as f:
+                    self.history = deque(
+                        json.load(f)[:self.MAX_ENTRIES],
+                        maxlen=self.MAX_ENTRIES
+                    )
+                self.compact()
+                logger.info(
+                    f"Migrated {len(self.history)} replay history "
+                    "entries from legacy JSON store"
+                )
             else:
-                self.history = []
-                logging.info(
+                self.history = deque(maxlen=self.MAX_ENTRIES)
+                logger.info(
                     "No history file found, starting with empty history"
                 )
         except Exception as e:
-            logging.error(f"Error loading history: {e}")
-            self.history = []
-    
-    def save_history(self):
-        """Save history to file."""
+            logger.error(f"Error loading history: {e}")
+            self.history = deque(maxlen=self.MAX_ENTRIES)
+        self._rebuild_indexes()
+
+    @staticmethod
+    def _public_entry(entry):
+        """Format an entry's timestamps to ISO strings for API output.
+
+        Entries keep epoch floats internally; only the page actually
+        returned to the client pays for ISO formatting.
+        """
+        out = None
+        for key in ('started_at', 'completed_at'):
+            value = entry.get(key)
+            if isinstance(value, (int, float)):
+                if out is None:
+                    out = dict(entry)
+                out[key] = datetime.utcfromtimestamp(value).isoformat()
+        return out if out is not None else entry
+
+    @staticmethod
+    def _search_text(entry):
+        """Build the lowercase text the search filter matches against."""
+        return '{} {}'.format(
+            entry.get('filename', ''),
+            entry.get('config', {}).get('interface') or ''
+        ).lower()
+
+    def _index_entry(self, entry):
+        """Add one entry to the lookup indexes."""
+        if entry.get('replay_id'):
+            self._by_replay_id[entry['replay_id']] = entry
+        if entry.get('id'):
+            self._by_id[entry['id']] = entry
+            self._search_lc[entry['id']] = self._search_text(entry)
+
+    def _unindex_entry(self, entry):
+        """Remove one entry from the lookup indexes."""
+        self._by_replay_id.pop(entry.get('replay_id'), None)
+        self._by_id.pop(entry.get('id'), None)
+        self._search_lc.pop(entry.get('id'), None)
+
+    def _rebuild_indexes(self):
+        """Rebuild all lookup indexes from self.history."""
+        self._by_replay_id = {}
+        self._by_id = {}
+        self._search_lc = {}
+        for entry in self.history:
+            self._index_entry(entry)
+
+    def _apply_record(self, record):
+        """Apply one log record (an entry or an update) to the state."""
+        if record.get('op') == 'update':
+            for entry in self.history:
+                if entry.get('replay_id') == record.get('replay_id'):
+                    entry.update(record.get('fields', {}))
+                    break
+        else:
+            self.history.appendleft(record)
+
+    def _append_record(self, record):
+        """Append one record to the JSONL log, compacting periodically."""
+        try:
+            with open(self.history_file, 'ab') as f:
+                f.write(orjson.dumps(record, default=str) + b'\n')
+            self._append_count += 1
+            if self._append_count >= self.COMPACT_THRESHOLD:
+                self.compact()
+        except Exception as e:
+            logger.error(f"Error saving history: {e}")
+
+    def compact(self):
+        """Rewrite the log as one record per live entry."""
         try:
-            with open(self.history_file, 'w') as f:
-                json.dump(self.history, f, indent=2, default=str)
-            logging.debug(f"Saved {len(self.history)} replay history entries")
+            temp_file = self.history_file + '.tmp'
+            with open(temp_file, 'wb') as f:
+                # Oldest first so replaying the log restores the order
+                for entry in reversed(self.history):
+                    f.write(orjson.dumps(entry, default=str) + b'\n')
+            os.replace(temp_file, self.history_file)
+            self._append_count = len(self.history)
+            logger.debug(
+                f"Compacted history log to {len(self.history)} entries"
+            )
         except Exception as e:
-            logging.error(f"Error saving history: {e}")
+            logger.error(f"Error compacting history: {e}")
     
     def add_replay(self, replay_data: Dict) -> str:
         """Add a new replay to history."""
         try:
             history_entry = {
-                'id': str(uuid.uuid4()),
+                'id': new_id_hex(),
                 'filename': replay_data.get('filename', 'Unknown'),
                 'file_id': replay_data.get('file_id'),
                 'file_size': replay_data.get('file_size', 0),
@@ -58,7 +179,8 @@ class ReplayHistoryService:
                     'preload_pcap': replay_data.get('preload_pcap', False)
                 },
                 'status': 'running',
-                'started_at': datetime.utcnow().isoformat(),
+                # Epoch float; formatted to ISO only at the JSON boundary
+                'started_at': time.time(),
                 'completed_at': None,
                 'duration': None,
                 'packets_sent': None,
@@ -66,92 +188,107 @@ class ReplayHistoryService:
                 'replay_id': replay_data.get('replay_id')
             }
             
-            self.history.insert(0, history_entry)  # Add to beginning
-            
-            # Keep only last 100 entries
-            if len(self.history) > 100:
-                self.history = self.history[:100]
-            
-            self.save_history()
-            logging.info(f"Added replay to history: {history_entry['id']}")
+            # Bounded deque: appendleft evicts the oldest entry once
+            # full, so unindex it first
+            if len(self.history) == self.history.maxlen:
+                self._unindex_entry(self.history[-1])
+            self.history.appendleft(history_entry)
+            self._index_entry(history_entry)
+
+            self._append_record(history_entry)
+            logger.info(f"Added replay to history: {history_entry['id']}")
             return history_entry['id']
             
         except Exception as e:
-            logging.error(f"Error adding replay to history: {e}")
+            logger.error(f"Error adding replay to history: {e}")
             return None
     
     def update_replay_status(self, replay_id: str, status: str, **kwargs):
         """Update replay status and other fields."""
         try:
-            for entry in self.history:
-                if entry.get('replay_id') == replay_id:
-                    entry['status'] = status
-                    
-                    if status in ['completed', 'failed', 'stopped']:
-                        entry['completed_at'] = datetime.utcnow().isoformat()
-                        
-                        # Calculate duration
-                        if entry.get('started_at'):
-                            start_time = datetime.fromisoformat(
-                                entry['started_at']
-                            )
-                            end_time = datetime.utcnow()
-                            duration = (end_time - start_time).total_seconds()
-                            entry['duration'] = duration
-                    
-                    # Update additional fields
-                    for key, value in kwargs.items():
-                        if key in ['packets_sent', 'error_message']:
-                            entry[key] = value
-                    
-                    self.save_history()
-                    logging.info(
-                        f"Updated replay status: {replay_id} -> {status}"
-                    )
-                    return True
-            
-            logging.warning(f"Replay not found in history: {replay_id}")
+            entry = self._by_replay_id.get(replay_id)
+            if entry is not None:
+                fields = {'status': status}
+
+                if status in ['completed', 'failed', 'stopped']:
+                    now = time.time()
+                    fields['completed_at'] = now
+
+                    # Calculate duration
+                    started_at = entry.get('started_at')
+                    if isinstance(started_at, str):
+                        # Entry written before timestamps became floats:
+                        # naive UTC ISO string
+                        fields['duration'] = (
+                            datetime.utcnow() -
+                            datetime.fromisoformat(started_at)
+                        ).total_seconds()
+                    elif started_at:
+                        fields['duration'] = now - started_at
+
+                # Update additional fields
+                for key, value in kwargs.items():
+                    if key in ['packets_sent', 'error_message']:
+                        fields[key] = value
+
+                entry.update(fields)
+                self._append_record({
+                    'op': 'update',
+                    'replay_id': replay_id,
+                    'fields': fields
+                })
+                logger.info(
+                    f"Updated replay status: {replay_id} -> {status}"
+                )
+                return True
+
+            logger.warning(f"Replay not found in history: {replay_id}")
             return False
             
         except Exception as e:
-            logging.error(f"Error updating replay status: {e}")
+            logger.error(f"Error updating replay status: {e}")
             return False
     
     def get_history(self, limit: int = 50, offset: int = 0,
                     search: str = None, status: str = None) -> Dict:
         """Get replay history with pagination, search, and filtering."""
         try:
-            # Start with all history
-            filtered_history = self.history.copy()
-            
-            # Apply search filter
-            if search and search.strip():
-                search_term = search.strip().lower()
-                filtered_history = [
-                    entry for entry in filtered_history
-                    if (search_term in entry.get('filename', '').lower() or
-                        search_term in entry.get('config', {}).get(
-                            'interface', '').lower())
-                ]
-            
-            # Apply status filter
-            if status and status.upper() != 'ALL':
-                status_filter = status.lower()
-                filtered_history = [
-                    entry for entry in filtered_history
-                    if entry.get('status', '').lower() == status_filter
-                ]
-            
-            # Get total count after filtering
-            total_count = len(filtered_history)
-            
-            # Apply pagination
-            start_idx = offset
+            search_term = (
+                search.strip().lower() if search and search.strip() else None
+            )
+            status_filter = (
+                status.lower() if status and status.upper() != 'ALL' else None
+            )
+
             end_idx = offset + limit
-            paginated_history = filtered_history[start_idx:end_idx]
-            
+
+            if search_term is None and status_filter is None:
+                # Unfiltered: take the page straight off the deque
+                total_count = len(self.history)
+                paginated_history = islice(self.history, offset, end_idx)
+            else:
+                # Single filtered pass that counts matches and collects
+                # only the requested page, instead of materializing the
+                # whole filtered list first
+                search_lc = self._search_lc
+                paginated_history = []
+                total_count = 0
+                for entry in self.history:
+                    if search_term is not None and search_term not in (
+                            search_lc.get(entry.get('id')) or
+                            self._search_text(entry)):
+                        continue
+                    if (status_filter is not None and
+                            entry.get('status', '').lower() != status_filter):
+                        continue
+                    if offset <= total_count < end_idx:
+                        paginated_history.append(entry)
+                    total_count += 1
+
             return {
-                'history': paginated_history,
+                'history': [
+                    self._public_entry(entry) for entry in paginated_history
+                ],
                 'total_count': total_count,
                 'limit': limit,
                 'offset': offset,
@@ -160,7 +297,7 @@ class ReplayHistoryService:
                 'status': status
             }
         except Exception as e:
-            logging.error(f"Error getting history: {e}")
+            logger.error(f"Error getting history: {e}")
             return {
                 'history': [],
                 'total_count': 0,
@@ -174,31 +311,29 @@ class ReplayHistoryService:
     def get_replay_by_id(self, history_id: str) -> Optional[Dict]:
         """Get a specific replay by history ID."""
         try:
-            for entry in self.history:
-                if entry.get('id') == history_id:
-                    return entry
-            return None
+            entry = self._by_id.get(history_id)
+            return self._public_entry(entry) if entry else None
         except Exception as e:
-            logging.error(f"Error getting replay by ID: {e}")
+            logger.error(f"Error getting replay by ID: {e}")
             return None
     
     def clear_history(self):
         """Clear all history."""
         try:
-            self.history = []
-            self.save_history()
-            logging.info("Cleared replay history")
+            self.history.clear()
+            self._rebuild_indexes()
+            self.compact()
+            logger.info("Cleared replay history")
         except Exception as e:
-            logging.error(f"Error clearing history: {e}")
+            logger.error(f"Error clearing history: {e}")
 
 
-# Global instance
-_history_service = None
+# Global instance, created eagerly at import time so the first request
+# doesn't pay for the history load and concurrent requests at startup
+# can't race the lazy initialization
+_history_service = ReplayHistoryService()
 
 
 def get_history_service() -> ReplayHistoryService:
     """Get the global history service instance."""
-    global _history_service
-    if _history_service is None:
-        _history_service = ReplayHistoryService()
     return _history_service
@@ -1,21 +1,38 @@
+import itertools
 import logging
 import threading
-import queue
+from collections import deque
 from datetime import datetime
 
+import orjson
+
+from config import Config
+
 
 class LogStreamer:
     """Service for streaming application logs to WebSocket clients."""
     
     def __init__(self):
-        self.log_queue = queue.Queue(maxsize=1000)  # Buffer for log messages
         self.clients = set()  # Connected WebSocket clients
         self.is_streaming = False
-        self.stream_thread = None
         self.socketio = None
         self.log_handler = None
-        self.log_buffer = []  # Keep recent logs in memory
+        # Entries waiting to be emitted; a flush task is scheduled on
+        # demand instead of a dedicated thread polling a queue
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
+        # Second-level timestamp cache: the date/time prefix only
+        # changes once a second, so don't rebuild it per record
+        self._last_sec = None
+        self._last_sec_iso = ''
         self.max_buffer_size = 500
+        # Ring buffer of recent logs: append-with-eviction is O(1),
+        # unlike list.append + pop(0) which shifts the whole buffer
+        self.log_buffer = deque(maxlen=self.max_buffer_size)
+        # Same entries pre-serialized as JSON bytes at ingest time, so
+        # /logs/recent can concatenate instead of re-encoding per request
+        self.serialized_ring = deque(maxlen=self.max_buffer_size)
         
     def start_streaming(self, socketio):
         """Start the log streaming service."""
@@ -24,15 +41,11 @@ class LogStreamer:
             
         self.socketio = socketio
         self.is_streaming = True
-        
-        # Set up custom log handler to capture logs
+
+        # Set up custom log handler to capture logs; flush tasks are
+        # scheduled on demand, so there is no streaming thread to start
         self.setup_log_handler()
-        
-        # Start streaming thread
-        self.stream_thread = threading.Thread(
-            target=self._stream_logs, daemon=True)
-        self.stream_thread.start()
-        
+
         logging.info("Log streaming service started")
     
     def stop_streaming(self):
@@ -71,9 +84,15 @@ class LogStreamer:
     def add_log_entry(self, record, formatted_message):
         """Add a log entry to the queue for streaming."""
         try:
+            created = record.created
+            sec = int(created)
+            if sec != self._last_sec:
+                self._last_sec = sec
+                self._last_sec_iso = datetime.fromtimestamp(sec).isoformat()
+
             log_data = {
-                'timestamp': datetime.fromtimestamp(
-                    record.created).isoformat(),
+                'timestamp': '%s.%06d' % (
+                    self._last_sec_iso, (created - sec) * 1e6),
                 'level': record.levelname,
                 'logger': record.name,
                 'message': record.getMessage(),
@@ -84,40 +103,53 @@ class LogStreamer:
                 'funcName': record.funcName
             }
             
-            # Add to buffer
+            # Add to buffer (deque evicts the oldest entry itself)
             self.log_buffer.append(log_data)
-            if len(self.log_buffer) > self.max_buffer_size:
-                self.log_buffer.pop(0)
-            
-            # Add to queue for real-time streaming
-            if not self.log_queue.full():
-                self.log_queue.put(log_data)
-                
+            self.serialized_ring.append(orjson.dumps(log_data))
+
+            # Stage for streaming and schedule a flush if none is due,
+            # but only while someone is actually watching — with no
+            # viewers connected the lock, staging list and background
+            # task are all skipped
+            if self.is_streaming and self.socketio and self.clients:
+                with self._pending_lock:
+                    self._pending.append(log_data)
+                    schedule = not self._flush_scheduled
+                    if schedule:
+                        self._flush_scheduled = True
+                if schedule:
+                    self.socketio.start_background_task(self._flush_pending)
+
         except Exception:
             # Don't let logging errors break the app
             pass
-    
-    def _stream_logs(self):
-        """Stream logs to connected WebSocket clients."""
-        while self.is_streaming:
-            try:
-                # Get log entry from queue (blocking with timeout)
-                log_data = self.log_queue.get(timeout=1.0)
-                
-                # Emit to all connected clients with error handling
-                if self.socketio and self.clients:
-                    try:
-                        self.socketio.emit('log_entry', log_data,
-                                           room='log_viewers')
-                    except Exception:
-                        # Don't log emit errors to prevent recursion
-                        pass
-                    
-            except queue.Empty:
-                continue
-            except Exception:
-                # Avoid logging errors that could cause recursion
-                pass
+
+    def _flush_pending(self):
+        """Emit staged entries as coalesced 'log_batch' frames.
+
+        Runs as a short-lived background task: it sleeps out the batch
+        window so entries arriving close together go out as one frame,
+        then drains everything staged since scheduling. No thread polls
+        a queue at idle.
+        """
+        try:
+            self.socketio.sleep(Config.LOG_BATCH_INTERVAL_MS / 1000.0)
+            with self._pending_lock:
+                batch = self._pending
+                self._pending = []
+                self._flush_scheduled = False
+
+            if not batch or not self.clients:
+                return
+            for start in range(0, len(batch), Config.LOG_BATCH_MAX):
+                self.socketio.emit(
+                    'log_batch',
+                    batch[start:start + Config.LOG_BATCH_MAX],
+                    room='log_viewers'
+                )
+        except Exception:
+            # Avoid logging errors that could cause recursion
+            pass
     
     def add_client(self, client_id):
         """Add a client to receive log streams."""
@@ -126,7 +158,12 @@ class LogStreamer:
         
         # Send recent logs to new client
         if self.socketio and self.log_buffer:
-            recent_logs = self.log_buffer[-50:]  # Send last 50 logs
+            # Send last 50 logs (deques don't slice)
+            recent_logs = list(itertools.islice(
+                self.log_buffer,
+                max(0, len(self.log_buffer) - 50),
+                len(self.log_buffer)
+            ))
             self.socketio.emit('log_history', {
                 'logs': recent_logs,
                 'count': len(recent_logs)
@@ -139,7 +176,20 @@ class LogStreamer:
     
     def get_recent_logs(self, count=100):
         """Get recent log entries."""
-        return self.log_buffer[-count:] if self.log_buffer else []
+        buf = self.log_buffer
+        return list(itertools.islice(buf, max(0, len(buf) - count), len(buf)))
+
+    def get_recent_logs_bytes(self, count=100):
+        """Get recent log entries as a pre-serialized JSON response body.
+
+        Joins the JSON bytes cached at ingest time instead of
+        re-encoding every entry on each /logs/recent request.
+        """
+        ring = self.serialized_ring
+        n = min(count, len(ring))
+        tail = itertools.islice(ring, len(ring) - n, len(ring))
+        return (b'{"logs":[' + b','.join(tail) +
+                b'],"count":' + str(n).encode() + b'}')
     
     def get_log_stats(self):
         """Get logging statistics."""
@@ -147,7 +197,7 @@ class LogStreamer:
             'total_logs_buffered': len(self.log_buffer),
             'connected_clients': len(self.clients),
             'is_streaming': self.is_streaming,
-            'queue_size': self.log_queue.qsize()
+            'queue_size': len(self._pending)
         }
 
 
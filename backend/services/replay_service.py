@@ -1,15 +1,38 @@
 import subprocess
 import threading
+import queue
+import re
 import time
-import uuid
 import logging
 import os
-from datetime import datetime
+from collections import deque
+
+from utils.ids import new_id_hex
+from utils.timefmt import utc_isoformat
+
+# Precompiled patterns for tcpreplay's final statistics output, e.g.
+# "Actual: 78 packets (49693 bytes) sent in 3.71 seconds" and
+# "Rated: 77648.8 Bps, 0.62 Mbps, 137.25 pps"
+_RE_ACTUAL = re.compile(
+    r'Actual:\s+(\d+)\s+packets\s+\((\d+)\s+bytes\)\s+'
+    r'sent in\s+([\d.]+)\s+seconds'
+)
+_RE_PPS = re.compile(r'([\d.]+)\s+pps')
+
+# tcpreplay availability cannot change while the process runs; probe it
+# once instead of forking `tcpreplay --version` per interface test
+_tcpreplay_available = None
+
+# Interface accessibility cache: interface -> (ok, message, expiry).
+# The UI polls interface status, and each uncached test forks a
+# tcpreplay dry run
+_IFACE_TEST_TTL = 30.0
+_iface_test_cache = {}
 
 
 class ReplayManager:
     """Manages PCAP replay operations using tcpreplay."""
-    
+
     def __init__(self):
         self.current_process = None
         self.current_replay_id = None
@@ -18,6 +41,31 @@ class ReplayManager:
         self.replay_stats = {}
         self.socketio = None
         self.lock = threading.Lock()
+        # Single long-lived worker that drains this queue and calls
+        # socketio.emit, so the replay thread never blocks on emits and
+        # SocketIO is only touched from one place
+        self._emit_queue = queue.Queue()
+        self._emit_thread = threading.Thread(
+            target=self._emit_loop,
+            daemon=True
+        )
+        self._emit_thread.start()
+
+    def _emit(self, event, data):
+        """Queue a SocketIO event for the background emit worker."""
+        if self.socketio:
+            # Copy so later mutation of replay_stats doesn't race the emit
+            self._emit_queue.put((event, dict(data)))
+
+    def _emit_loop(self):
+        """Drain queued events and emit them to connected clients."""
+        while True:
+            event, data = self._emit_queue.get()
+            try:
+                if self.socketio:
+                    self.socketio.emit(event, data)
+            except Exception as e:
+                logging.debug("Error emitting %s: %s", event, e)
     
     def start_replay(self, file_path, interface, speed, speed_unit='multiplier', continuous=False, socketio=None):
         """
@@ -38,7 +86,7 @@ class ReplayManager:
             if self.is_replay_running:
                 raise RuntimeError("Replay already in progress")
             
-            replay_id = str(uuid.uuid4())
+            replay_id = new_id_hex()
             self.current_replay_id = replay_id
             self.socketio = socketio
             
@@ -53,7 +101,7 @@ class ReplayManager:
                 'speed': speed,
                 'speed_unit': speed_unit,
                 'continuous': continuous,
-                'start_time': datetime.utcnow().isoformat(),
+                'start_time': utc_isoformat(),
                 'status': 'starting',
                 'packets_sent': 0,
                 'bytes_sent': 0,
@@ -75,9 +123,9 @@ class ReplayManager:
             
             # Log the command prominently for user visibility
             cmd_str = ' '.join(cmd)
-            logging.info(f"REPLAY_COMMAND: {cmd_str}")
-            logging.info(f"Started replay {replay_id} for file: {os.path.basename(file_path)}")
-            logging.info(f"Interface: {interface}, Speed: {speed} {speed_unit}")
+            logging.info("REPLAY_COMMAND: %s", cmd_str)
+            logging.info("Started replay %s for file: %s", replay_id, os.path.basename(file_path))
+            logging.info("Interface: %s, Speed: %s %s", interface, speed, speed_unit)
             
             # Log expected vs actual timing for debugging
             if speed_unit == 'multiplier' and hasattr(self, '_log_timing_expectation'):
@@ -91,7 +139,7 @@ class ReplayManager:
             if not self.is_replay_running:
                 return False
             
-            logging.info(f"STOP_COMMAND: Terminating replay process {self.current_replay_id}")
+            logging.info("STOP_COMMAND: Terminating replay process %s", self.current_replay_id)
             
             if self.current_process:
                 try:
@@ -110,20 +158,19 @@ class ReplayManager:
                         self.current_process.wait()
                         
                 except Exception as e:
-                    logging.error(f"Error stopping replay process: {str(e)}")
+                    logging.error("Error stopping replay process: %s", e)
             
             self.is_replay_running = False
             self.replay_stats['status'] = 'stopped'
-            self.replay_stats['end_time'] = datetime.utcnow().isoformat()
+            self.replay_stats['end_time'] = utc_isoformat()
             
             # Update history service
             self._update_history_status()
             
             # Notify clients
-            if self.socketio:
-                self.socketio.emit('replay_status', self.replay_stats)
+            self._emit('replay_status', self.replay_stats)
             
-            logging.info(f"Replay {self.current_replay_id} stopped successfully")
+            logging.info("Replay %s stopped successfully", self.current_replay_id)
             return True
     
     def is_running(self):
@@ -141,38 +188,51 @@ class ReplayManager:
     
     def test_interface_access(self, interface):
         """Test if tcpreplay can access the specified interface."""
+        global _tcpreplay_available
         try:
+            cached = _iface_test_cache.get(interface)
+            if cached is not None and cached[2] > time.time():
+                return cached[0], cached[1]
+
             # Test with tcpreplay --version to see if it's available
-            version_cmd = ['tcpreplay', '--version']
-            logging.info(f"TEST_COMMAND: {' '.join(version_cmd)}")
-            result = subprocess.run(version_cmd, 
-                                  capture_output=True, text=True, timeout=5)
-            if result.returncode != 0:
-                logging.error(f"tcpreplay not available: {result.stderr}")
+            if _tcpreplay_available is None:
+                version_cmd = ['tcpreplay', '--version']
+                logging.info("TEST_COMMAND: %s", ' '.join(version_cmd))
+                result = subprocess.run(version_cmd,
+                                      capture_output=True, text=True, timeout=5)
+                _tcpreplay_available = result.returncode == 0
+                if not _tcpreplay_available:
+                    logging.error("tcpreplay not available: %s", result.stderr)
+            if not _tcpreplay_available:
                 return False, "tcpreplay not available"
-            
+
             # Test interface access with a dry run
             test_cmd = ['tcpreplay', '--intf1', interface, '--dualfile']
-            logging.info(f"TEST_COMMAND: {' '.join(test_cmd)}")
-            result = subprocess.run(test_cmd, 
+            logging.info("TEST_COMMAND: %s", ' '.join(test_cmd))
+            result = subprocess.run(test_cmd,
                                   capture_output=True, text=True, timeout=5)
-            
+
             # tcpreplay will fail without a file, but we can check the error message
             if "permission denied" in result.stderr.lower():
-                logging.warning(f"Permission denied accessing interface {interface}")
-                return False, "Permission denied accessing interface"
+                logging.warning("Permission denied accessing interface %s", interface)
+                ok, msg = False, "Permission denied accessing interface"
             elif "no such device" in result.stderr.lower():
-                logging.warning(f"Interface {interface} not found")
-                return False, f"Interface {interface} not found"
-            
-            logging.info(f"Interface {interface} is accessible")
-            return True, "Interface accessible"
-            
+                logging.warning("Interface %s not found", interface)
+                ok, msg = False, f"Interface {interface} not found"
+            else:
+                logging.info("Interface %s is accessible", interface)
+                ok, msg = True, "Interface accessible"
+
+            _iface_test_cache[interface] = (
+                ok, msg, time.time() + _IFACE_TEST_TTL
+            )
+            return ok, msg
+
         except subprocess.TimeoutExpired:
-            logging.error(f"tcpreplay test timed out for interface {interface}")
+            logging.error("tcpreplay test timed out for interface %s", interface)
             return False, "tcpreplay test timed out"
         except Exception as e:
-            logging.error(f"Interface test failed: {str(e)}")
+            logging.error("Interface test failed: %s", e)
             return False, f"Test failed: {str(e)}"
 
     def _build_tcpreplay_command(self, file_path, interface, speed, speed_unit):
@@ -208,12 +268,11 @@ class ReplayManager:
             continuous = self.replay_stats.get('continuous', False)
             
             # Notify clients that replay started
-            if self.socketio:
-                self.socketio.emit('replay_status', self.replay_stats)
+            self._emit('replay_status', self.replay_stats)
             
             # Log continuous mode
             if continuous:
-                logging.info(f"Starting continuous replay mode for {replay_id}")
+                logging.info("Starting continuous replay mode for %s", replay_id)
             
             # Main replay loop - runs once for normal mode, loops for continuous
             while self.is_replay_running:
@@ -221,25 +280,46 @@ class ReplayManager:
                 self.replay_stats['loop_count'] += 1
                 
                 if continuous and self.replay_stats['loop_count'] > 1:
-                    logging.info(f"Starting loop #{self.replay_stats['loop_count']} for continuous replay {replay_id}")
+                    logging.info("Starting loop #%s for continuous replay %s", self.replay_stats['loop_count'], replay_id)
                 
                 # Reset progress for each loop
                 self.replay_stats['progress_percent'] = 0
                 self.replay_stats['packets_sent'] = 0
                 self.replay_stats['bytes_sent'] = 0
                 
-                # Start tcpreplay process
+                # Start tcpreplay process. stderr is merged into stdout
+                # so there is a single pipe to drain, and output is read
+                # as raw bytes through a real buffer — line-buffered text
+                # mode issues tiny per-line read syscalls
                 self.current_process = subprocess.Popen(
                     cmd,
                     stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    universal_newlines=True,
-                    bufsize=1
+                    stderr=subprocess.STDOUT,
+                    bufsize=65536
                 )
                 
                 start_time = time.time()
                 last_progress_emit = 0
-                
+                # Tail of recent output for failure messages; stderr is
+                # merged into stdout, so the error text passes through
+                # the monitor loop before the process exits
+                recent_lines = deque(maxlen=5)
+
+                # Static progress fields built once per loop; only the
+                # numeric fields are refreshed between emits (the emit
+                # worker snapshots the dict before queueing it)
+                progress_template = {
+                    'replay_id': replay_id,
+                    'progress': 0,
+                    'packets_sent': 0,
+                    'bytes_sent': 0,
+                    'elapsed_time': 0,
+                    'loop_count': self.replay_stats['loop_count']
+                }
+                if continuous:
+                    progress_template['continuous'] = True
+
+
                 try:
                     # Monitor the process until it completes
                     while self.current_process.poll() is None and self.is_replay_running:
@@ -253,13 +333,15 @@ class ReplayManager:
                                 # Use select on Unix-like systems
                                 ready, _, _ = select.select([self.current_process.stdout], [], [], 0.5)
                                 if ready:
-                                    line = self.current_process.stdout.readline()
-                                    if line:
-                                        line = line.strip()
+                                    raw = self.current_process.stdout.readline()
+                                    if raw:
+                                        line = raw.decode(
+                                            'ascii', 'replace').strip()
                                         if line:
+                                            recent_lines.append(line)
                                             # Only log important lines
                                             if 'Actual:' in line or 'Error' in line or 'Failed' in line:
-                                                logging.info(f"tcpreplay output: {line}")
+                                                logging.info("tcpreplay output: %s", line)
                                             
                                             # Parse tcpreplay output for progress information
                                             self._parse_tcpreplay_output(line, start_time)
@@ -270,63 +352,68 @@ class ReplayManager:
                             # Emit progress update periodically
                             current_time = time.time()
                             if self.socketio and (current_time - last_progress_emit) >= 2:
-                                progress_data = {
-                                    'replay_id': replay_id,
-                                    'progress': self.replay_stats['progress_percent'],
-                                    'packets_sent': self.replay_stats['packets_sent'],
-                                    'bytes_sent': self.replay_stats['bytes_sent'],
-                                    'elapsed_time': self.replay_stats['elapsed_time'],
-                                    'loop_count': self.replay_stats['loop_count']
-                                }
-                                if continuous:
-                                    progress_data['continuous'] = True
-                                self.socketio.emit('replay_progress', progress_data)
+                                stats = self.replay_stats
+                                progress_template.update(
+                                    progress=stats['progress_percent'],
+                                    packets_sent=stats['packets_sent'],
+                                    bytes_sent=stats['bytes_sent'],
+                                    elapsed_time=stats['elapsed_time']
+                                )
+                                self._emit('replay_progress', progress_template)
                                 last_progress_emit = current_time
                                 
                         except Exception as e:
-                            logging.debug(f"Error reading process output: {e}")
+                            logging.debug("Error reading process output: %s", e)
                             time.sleep(0.1)
                     
                     # Wait for process to complete and get final output
+                    # Wait for the process to exit, then drain the one
+                    # pipe directly: readline already consumed every
+                    # complete line, so only the unread tail remains.
+                    # communicate() would spin up reader machinery for
+                    # a pipe that is nearly empty.
                     if self.current_process.poll() is None:
                         # Process is still running, terminate it
                         self.current_process.terminate()
                         try:
-                            stdout, stderr = self.current_process.communicate(timeout=5)
+                            self.current_process.wait(timeout=5)
                         except subprocess.TimeoutExpired:
                             self.current_process.kill()
-                            stdout, stderr = self.current_process.communicate()
-                    else:
-                        # Process completed normally
-                        stdout, stderr = self.current_process.communicate()
-                    
-                    return_code = self.current_process.returncode
-                    
+
+                    stdout = self.current_process.stdout.read()
+                    return_code = self.current_process.wait()
+
                     # Process any remaining output
-                    if stdout:
-                        for line in stdout.strip().split('\n'):
-                            if line.strip():
-                                logging.info(f"tcpreplay final output: {line.strip()}")
-                                self._parse_tcpreplay_output(line.strip(), start_time)
-                    
+                    output = stdout.decode('ascii', 'replace') if stdout else ''
+                    if output:
+                        for line in output.strip().split('\n'):
+                            line = line.strip()
+                            if line:
+                                logging.info("tcpreplay final output: %s", line)
+                                recent_lines.append(line)
+                                self._parse_tcpreplay_output(line, start_time)
+
                     # Check if replay failed (only if we're still supposed to be running)
                     if return_code != 0 and self.is_replay_running:
                         # Only treat as error if we didn't manually stop it
                         error_msg = f"tcpreplay exited with code {return_code}"
-                        if stderr:
-                            error_msg += f": {stderr.strip()}"
+                        if recent_lines:
+                            # stderr is merged into stdout; the error text
+                            # is in the trailing lines
+                            error_msg += ": " + '\n'.join(
+                                list(recent_lines)[-3:])
                         self.replay_stats['error'] = error_msg
-                        logging.error(f"tcpreplay error: {error_msg}")
+                        logging.error("tcpreplay error: %s", error_msg)
                         break
                     elif return_code != 0 and not self.is_replay_running:
                         # Process was terminated due to manual stop - this is expected
-                        logging.info(f"tcpreplay exited with code {return_code} after manual stop - this is expected")
+                        logging.info("tcpreplay exited with code %s after manual stop - this is expected", return_code)
                     
                     # Log completion of this iteration
-                    logging.info(f"Completed loop #{self.replay_stats['loop_count']} for replay {replay_id}")
+                    logging.info("Completed loop #%s for replay %s", self.replay_stats['loop_count'], replay_id)
                     
                 except Exception as e:
-                    logging.error(f"Error during process monitoring: {e}")
+                    logging.error("Error during process monitoring: %s", e)
                     break
                 finally:
                     # Clean up process
@@ -345,7 +432,7 @@ class ReplayManager:
                 
                 # For continuous mode, add delay between loops and check if we should continue
                 if continuous and self.is_replay_running:
-                    logging.info(f"Waiting 2 seconds before starting loop #{self.replay_stats['loop_count'] + 1}")
+                    logging.info("Waiting 2 seconds before starting loop #%s", self.replay_stats['loop_count'] + 1)
                     # Use smaller sleep intervals to allow for responsive stopping
                     for _ in range(20):  # 20 * 0.1 = 2 seconds total
                         if not self.is_replay_running:
@@ -370,37 +457,35 @@ class ReplayManager:
                             self.replay_stats['status'] = 'completed'  # Normal replay completed
                         self.replay_stats['progress_percent'] = 100
                     
-                    self.replay_stats['end_time'] = datetime.utcnow().isoformat()
+                    self.replay_stats['end_time'] = utc_isoformat()
                     
                     # Update history service only if status changed
                     self._update_history_status()
                     
                     # Final status update
-                    if self.socketio:
-                        self.socketio.emit('replay_status', self.replay_stats)
+                    self._emit('replay_status', self.replay_stats)
                 else:
                     # Status was already set to 'stopped' by manual stop - don't override it
-                    logging.info(f"Replay {replay_id} thread completed but status already set to 'stopped' - not overriding")
+                    logging.info("Replay %s thread completed but status already set to 'stopped' - not overriding", replay_id)
                 
                 self.is_replay_running = False
             
             if continuous:
-                logging.info(f"Continuous replay {replay_id} completed {self.replay_stats['loop_count']} loops")
+                logging.info("Continuous replay %s completed %s loops", replay_id, self.replay_stats['loop_count'])
             else:
-                logging.info(f"Replay {replay_id} completed")
+                logging.info("Replay %s completed", replay_id)
             
         except Exception as e:
-            logging.error(f"Error during replay {replay_id}: {str(e)}")
+            logging.error("Error during replay %s: %s", replay_id, e)
             
             with self.lock:
                 self.replay_stats['status'] = 'error'
                 self.replay_stats['error'] = str(e)
-                self.replay_stats['end_time'] = datetime.utcnow().isoformat()
+                self.replay_stats['end_time'] = utc_isoformat()
                 self.is_replay_running = False
                 
-                if self.socketio:
-                    self.socketio.emit('replay_status', self.replay_stats)
-        
+                self._emit('replay_status', self.replay_stats)
+
         finally:
             self.current_process = None
     
@@ -410,65 +495,48 @@ class ReplayManager:
             current_time = time.time()
             elapsed = current_time - start_time
             self.replay_stats['elapsed_time'] = elapsed
-            
-            # Log the line for debugging
-            logging.debug(f"tcpreplay output: {line}")
-            
+
+            # Lazy %s formatting so the string is only built when a
+            # DEBUG handler is actually attached
+            logging.debug("tcpreplay output: %s", line)
+
             # tcpreplay verbose output patterns:
             # "Actual: 2809 packets (1588752 bytes) sent in 20.47 seconds"
             # "Rated: 77648.8 Bps, 0.62 Mbps, 137.25 pps"
             # "Statistics for network device: ens224"
-            
+
             # Look for final statistics line
-            if 'Actual:' in line and 'packets' in line and 'bytes' in line and 'sent in' in line:
-                # Parse: "Actual: 78 packets (49693 bytes) sent in 3.71 seconds"
+            # "Actual: 78 packets (49693 bytes) sent in 3.71 seconds"
+            if 'Actual:' in line:
                 try:
-                    logging.info(f"Parsing final statistics: {line}")
-                    
-                    # Extract packets - look for number before "packets"
-                    import re
-                    packets_match = re.search(r'(\d+)\s+packets', line)
-                    if packets_match:
-                        packets = int(packets_match.group(1))
-                        self.replay_stats['packets_sent'] = packets
-                        logging.info(f"Extracted packets: {packets}")
-                    
-                    # Extract bytes - look for number in parentheses before "bytes"
-                    bytes_match = re.search(r'\((\d+)\s+bytes\)', line)
-                    if bytes_match:
-                        bytes_sent = int(bytes_match.group(1))
-                        self.replay_stats['bytes_sent'] = bytes_sent
-                        logging.info(f"Extracted bytes: {bytes_sent}")
-                    
-                    # Extract time - look for number before "seconds"
-                    time_match = re.search(r'sent in\s+([\d.]+)\s+seconds', line)
-                    if time_match:
-                        actual_time = float(time_match.group(1))
-                        self.replay_stats['actual_replay_time'] = actual_time
-                        self.replay_stats['elapsed_time'] = actual_time
-                        logging.info(f"Extracted time: {actual_time}")
-                    
+                    logging.info("Parsing final statistics: %s", line)
+
+                    match = _RE_ACTUAL.search(line)
+                    if match:
+                        packets, bytes_sent, actual_time = match.groups()
+                        self.replay_stats['packets_sent'] = int(packets)
+                        self.replay_stats['bytes_sent'] = int(bytes_sent)
+                        self.replay_stats['actual_replay_time'] = float(
+                            actual_time)
+                        self.replay_stats['elapsed_time'] = float(actual_time)
+
                     # Set progress to 100% when we get final stats
                     self.replay_stats['progress_percent'] = 100
-                    logging.info(f"Updated stats: {self.replay_stats}")
-                    
+                    logging.info("Updated stats: %s", self.replay_stats)
+
                 except (ValueError, IndexError) as e:
-                    logging.error(f"Error parsing statistics line: {e}")
-            
+                    logging.error("Error parsing statistics line: %s", e)
+
             # Look for rate information
+            # "Rated: 77648.8 Bps, 0.62 Mbps, 137.25 pps"
             elif 'Rated:' in line and 'Bps' in line:
-                # Parse: "Rated: 77648.8 Bps, 0.62 Mbps, 137.25 pps"
                 try:
-                    if 'pps' in line:
-                        parts = line.split(',')
-                        for part in parts:
-                            if 'pps' in part:
-                                pps_str = part.strip().split()[0]
-                                pps = float(pps_str)
-                                self.replay_stats['packets_per_second'] = pps
-                                break
+                    pps_match = _RE_PPS.search(line)
+                    if pps_match:
+                        self.replay_stats['packets_per_second'] = float(
+                            pps_match.group(1))
                 except (ValueError, IndexError) as e:
-                    logging.debug(f"Error parsing rate line: {e}")
+                    logging.debug("Error parsing rate line: %s", e)
             
             # For progress estimation during replay, use elapsed time
             # This is approximate since tcpreplay doesn't give real-time progress
@@ -479,7 +547,7 @@ class ReplayManager:
                 self.replay_stats['progress_percent'] = progress
             
         except Exception as e:
-            logging.debug(f"Error parsing tcpreplay output: {str(e)}")
+            logging.debug("Error parsing tcpreplay output: %s", e)
     
     def _update_history_status(self):
         """Update the history service with replay completion status."""
@@ -502,10 +570,10 @@ class ReplayManager:
                 
                 # Update history
                 history_service.update_replay_status(replay_id, status, **update_data)
-                logging.info(f"Updated history for replay {replay_id}: {status}")
+                logging.info("Updated history for replay %s: %s", replay_id, status)
             
         except Exception as e:
-            logging.error(f"Error updating history status: {e}")
+            logging.error("Error updating history status: %s", e)
     
     def _log_timing_expectation(self, file_path, speed):
         """Log expected timing for debugging speed issues."""
@@ -519,14 +587,17 @@ class ReplayManager:
                 original_duration = pcap_info['duration']
                 expected_duration = original_duration / speed
                 
-                logging.info(f"TIMING DEBUG - Original duration: {original_duration:.2f}s, "
-                           f"Speed: {speed}x, Expected duration: {expected_duration:.2f}s")
+                logging.info(
+                    "TIMING DEBUG - Original duration: %.2fs, "
+                    "Speed: %sx, Expected duration: %.2fs",
+                    original_duration, speed, expected_duration
+                )
                 
                 self.replay_stats['expected_duration'] = expected_duration
                 self.replay_stats['original_duration'] = original_duration
             
         except Exception as e:
-            logging.debug(f"Could not log timing expectation: {e}")
+            logging.debug("Could not log timing expectation: %s", e)
 
 
 # Global replay manager instance
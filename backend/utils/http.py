@@ -0,0 +1,24 @@
+import hashlib
+
+from flask import request
+
+
+def conditional_json(response, max_age=2):
+    """Attach an ETag to a JSON response and honor If-None-Match.
+
+    The UI polls several GET endpoints every few seconds; when the
+    payload has not changed the client gets an empty 304 instead of
+    the full JSON body.
+
+    Args:
+        response: Flask response object (e.g. from jsonify)
+        max_age: Cache-Control max-age in seconds
+
+    Returns:
+        Response: the response, or a 304 if the client's ETag matches
+    """
+    etag = hashlib.blake2b(response.get_data(), digest_size=16).hexdigest()
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
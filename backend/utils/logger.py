@@ -1,34 +1,64 @@
 import logging
+import logging.handlers
 import os
+import queue
 from datetime import datetime
 
+# Listener thread that performs the actual file/console IO; kept at
+# module level so repeat setup_logger calls don't stack handlers
+_queue_listener = None
+
 
 def setup_logger():
-    """Configure application logging."""
+    """Configure application logging.
+
+    Log calls only enqueue the record onto an in-memory queue; a
+    QueueListener thread does the file and console writes. This keeps
+    blocking IO and handler-lock contention out of the replay monitor
+    and emit threads.
+    """
+    global _queue_listener
+
+    if _queue_listener is not None:
+        return logging.getLogger(__name__)
+
     log_level = os.environ.get('LOG_LEVEL', 'INFO').upper()
     log_file = os.environ.get('LOG_FILE', '/var/log/pcap_replaya.log')
-    
+
     # Create logs directory if it doesn't exist
     log_dir = os.path.dirname(log_file)
     if log_dir and not os.path.exists(log_dir):
         os.makedirs(log_dir, exist_ok=True)
-    
+
     # Configure logging format
     log_format = (
         '%(asctime)s - %(name)s - %(levelname)s - '
         '%(filename)s:%(lineno)d - %(message)s'
     )
-    
-    # Configure root logger
-    logging.basicConfig(
-        level=getattr(logging, log_level),
-        format=log_format,
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()  # Also log to console
-        ]
+    formatter = logging.Formatter(log_format)
+
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(formatter)
+    console_handler = logging.StreamHandler()  # Also log to console
+    console_handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(-1)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(getattr(logging, log_level))
+
+    # Drop any handlers installed before setup ran (e.g. basicConfig's
+    # default stderr handler from an import-time log call) so records
+    # aren't also emitted inline on the caller's thread
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _queue_listener = logging.handlers.QueueListener(
+        log_queue, file_handler, console_handler
     )
-    
+    _queue_listener.start()
+
     # Set specific loggers
     logging.getLogger('werkzeug').setLevel(logging.WARNING)
     logging.getLogger('socketio').setLevel(logging.WARNING)
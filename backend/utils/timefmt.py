@@ -0,0 +1,30 @@
+import time
+
+# Per-second cache for the date/time prefix; it only changes once a
+# second, so repeated calls within the same second just format the
+# microsecond suffix
+_last_sec = None
+_last_sec_str = ''
+
+
+def utc_isoformat(t=None):
+    """Format an epoch timestamp as a naive-UTC ISO 8601 string.
+
+    Produces the same output as datetime.utcnow().isoformat() but
+    avoids building a datetime object per call, which adds up on status
+    updates and progress emits.
+
+    Args:
+        t: Epoch seconds; defaults to the current time
+
+    Returns:
+        str: Timestamp like '2024-01-01T12:00:00.123456'
+    """
+    global _last_sec, _last_sec_str
+    if t is None:
+        t = time.time()
+    sec = int(t)
+    if sec != _last_sec:
+        _last_sec = sec
+        _last_sec_str = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(sec))
+    return '%s.%06d' % (_last_sec_str, (t - sec) * 1e6)
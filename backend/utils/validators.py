@@ -1,63 +1,231 @@
 import os
+import re
+from typing import Dict, List, Optional, Tuple
+
 from werkzeug.utils import secure_filename
 from config import Config
 
+# Interface names: alphanumerics plus hyphen/underscore/dot, length
+# capped; one compiled-regex pass instead of chained str.replace copies
+_IFACE_RE = re.compile(r'\A[A-Za-z0-9._-]{1,64}\Z')
+
+# Valid replay speed units
+_SPEED_UNITS = frozenset(('multiplier', 'pps'))
+
+# Per-unit speed caps and their rejection result tuples; a dict lookup
+# replaces the per-unit branching on the happy path
+_SPEED_CAPS = {
+    'multiplier': float(Config.MAX_REPLAY_SPEED),
+    'pps': 1000000.0,  # up to 1 million packets per second
+}
+_SPEED_CAP_ERRORS = {
+    'multiplier': (
+        False, f"Speed multiplier cannot exceed {Config.MAX_REPLAY_SPEED}x",
+        None),
+    'pps': (False, "PPS cannot exceed 1,000,000", None),
+}
+
+# Filenames that are already safe to store as-is: no leading dot, only
+# alphanumerics/dot/hyphen/underscore, bounded length. Anything else
+# goes through secure_filename
+_SAFE_FILENAME_RE = re.compile(r'\A[A-Za-z0-9_-][A-Za-z0-9._-]{0,254}\Z')
+
+# Allowed extensions as dot-prefixed suffixes: str.endswith with a
+# tuple scans only the filename tail, where Config.allowed_file
+# lowercases and rsplits the whole name per call
+_ALLOWED_SUFFIXES = tuple(
+    '.' + ext.lower() for ext in sorted(Config.ALLOWED_EXTENSIONS)
+)
+
+
+def _has_allowed_ext(filename: str) -> bool:
+    """Check the filename extension against the allowed suffixes."""
+    return filename.lower().endswith(_ALLOWED_SUFFIXES)
+
+
+# Result tuples for the success path and every static error message,
+# built once at import; returning the shared constants saves a tuple
+# allocation per call, and the config-derived messages are joined and
+# divided here instead of on every failed validation
+_OK = (True, None)
+_ERR_NO_FILE = (False, "No file provided")
+_ERR_NO_SELECTION = (False, "No file selected")
+_ERR_EMPTY = (False, "File is empty")
+_ERR_NOT_PCAP = (False, "File does not appear to be a valid PCAP file")
+_ERR_BAD_TYPE = (
+    False,
+    f"Invalid file type. Allowed: {', '.join(sorted(Config.ALLOWED_EXTENSIONS))}"
+)
+_ERR_TOO_LARGE = (
+    False,
+    f"File too large. Maximum size: "
+    f"{Config.MAX_CONTENT_LENGTH // (1024 * 1024 * 1024)}GB"
+)
+
+# Three-element variants for validate_replay_config, which also returns
+# the sanitized config slot
+_ERR_NOT_DICT = (False, "Configuration must be a dictionary", None)
+_ERR_SPEED_UNIT = (
+    False, "Invalid speed unit. Must be 'multiplier' or 'pps'", None)
+_ERR_SPEED_NAN = (False, "Speed must be a valid number", None)
+_ERR_SPEED_NONPOS = (False, "Speed must be greater than 0", None)
+_ERR_NO_IFACE = (False, "Network interface is required", None)
+_ERR_BAD_IFACE = (False, "Invalid interface name", None)
+
+# PCAP magic numbers, built once instead of per validation call; all
+# are 4 bytes, so format checks are a single set membership test on the
+# header prefix
+_PCAP_MAGIC = frozenset((
+    b'\xd4\xc3\xb2\xa1',  # Standard PCAP
+    b'\xa1\xb2\xc3\xd4',  # Standard PCAP (swapped)
+    b'\x0a\x0d\x0d\x0a',  # PCAPNG
+))
+
+# First bytes of the magics above: an integer gate that rejects most
+# non-capture uploads before the full 4-byte set lookup
+_PCAP_MAGIC_FIRST = frozenset((0xd4, 0xa1, 0x0a))
 
-def validate_pcap_file(file):
+
+def validate_pcap_file(file) -> Tuple[bool, Optional[str]]:
     """
     Validate uploaded file to ensure it's a valid PCAP file.
-    
+
     Args:
         file: FileStorage object from Flask request
-        
+
     Returns:
         tuple: (is_valid, error_message)
     """
-    if not file:
-        return False, "No file provided"
-    
-    if file.filename == '':
-        return False, "No file selected"
-    
+    return validate_pcap_files((file,))[0]
+
+
+def validate_pcap_files(files) -> List[Tuple[bool, Optional[str]]]:
+    """
+    Validate a batch of uploaded files in one pass.
+
+    Loop-invariant lookups (config constants, the magic set) are bound
+    to locals once, so a bulk upload does not repeat them per file.
+
+    Args:
+        files: Iterable of FileStorage objects
+
+    Returns:
+        list: One (is_valid, error_message) tuple per file
+    """
+    allowed_file = _has_allowed_ext
+    magic = _PCAP_MAGIC
+    magic_first = _PCAP_MAGIC_FIRST
+    max_size = Config.MAX_CONTENT_LENGTH
+    results = []
+
+    for file in files:
+        if not file:
+            results.append(_ERR_NO_FILE)
+            continue
+
+        if file.filename == '':
+            results.append(_ERR_NO_SELECTION)
+            continue
+
+        # Check file extension
+        if not allowed_file(file.filename):
+            results.append(_ERR_BAD_TYPE)
+            continue
+
+        # Check the magic bytes first: invalid uploads are rejected
+        # after 4 bytes of IO, before any size probing touches the
+        # spooled file. Only the read/seek can realistically raise, so
+        # the comparisons sit outside the handler and only OSError is
+        # treated as a validation failure
+        try:
+            file_header = file.read(4)  # Max magic length
+            file.seek(0)  # Reset file pointer
+        except OSError as e:
+            results.append((False, f"Error validating file: {e}"))
+            continue
+
+        if not file_header:
+            results.append(_ERR_EMPTY)
+            continue
+
+        if file_header[0] not in magic_first or file_header not in magic:
+            results.append(_ERR_NOT_PCAP)
+            continue
+
+        # Size: prefer the content length declared with the upload (no
+        # IO at all). fstat is cheapest once the spool has rolled to a
+        # real file, but calling fileno() on an in-memory spool would
+        # itself force that rollover, so unrolled (or unknown) streams
+        # pay the seek-to-end/tell/seek dance instead
+        file_size = getattr(file, 'content_length', 0) or 0
+        if not file_size:
+            stream = file.stream
+            if getattr(stream, '_rolled', True):
+                try:
+                    file_size = os.fstat(stream.fileno()).st_size
+                except (AttributeError, OSError, ValueError):
+                    pass
+            if not file_size:
+                file.seek(0, os.SEEK_END)
+                file_size = file.tell()
+                file.seek(0)  # Reset file pointer
+
+        if file_size > max_size:
+            results.append(_ERR_TOO_LARGE)
+            continue
+
+        results.append(_OK)
+
+    return results
+
+
+def validate_pcap_path(
+        filename: str, file_path: str) -> Tuple[bool, Optional[str]]:
+    """
+    Validate a PCAP file that has already been streamed to disk.
+
+    Args:
+        filename: Original client-supplied filename
+        file_path: Path to the file on disk
+
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    if not filename:
+        return _ERR_NO_FILE
+
     # Check file extension
-    if not Config.allowed_file(file.filename):
-        return False, f"Invalid file type. Allowed: {', '.join(Config.ALLOWED_EXTENSIONS)}"
-    
-    # Check file size (Flask handles this automatically, but we can add custom logic)
-    file.seek(0, os.SEEK_END)
-    file_size = file.tell()
-    file.seek(0)  # Reset file pointer
-    
+    if not _has_allowed_ext(filename):
+        return _ERR_BAD_TYPE
+
+    if not os.path.exists(file_path):
+        return _ERR_NO_FILE
+
+    file_size = os.path.getsize(file_path)
+
     if file_size == 0:
-        return False, "File is empty"
-    
+        return _ERR_EMPTY
+
     if file_size > Config.MAX_CONTENT_LENGTH:
-        return False, f"File too large. Maximum size: {Config.MAX_CONTENT_LENGTH // (1024*1024*1024)}GB"
-    
-    # Check file magic bytes to verify it's actually a PCAP file
+        return _ERR_TOO_LARGE
+
+    # Check file magic bytes to verify it's actually a PCAP file; only
+    # the open/read can raise, and only as an OSError
     try:
-        file_header = file.read(16)  # Read first 16 bytes
-        file.seek(0)  # Reset file pointer
-        
-        # PCAP magic numbers
-        pcap_magic = [
-            b'\xd4\xc3\xb2\xa1',  # Standard PCAP
-            b'\xa1\xb2\xc3\xd4',  # Standard PCAP (swapped)
-            b'\x0a\x0d\x0d\x0a',  # PCAPNG
-        ]
-        
-        is_pcap = any(file_header.startswith(magic_bytes) for magic_bytes in pcap_magic)
-        
-        if not is_pcap:
-            return False, "File does not appear to be a valid PCAP file"
-            
-    except Exception as e:
-        return False, f"Error validating file: {str(e)}"
-    
-    return True, None
+        with open(file_path, 'rb') as f:
+            file_header = f.read(4)  # Max magic length
+    except OSError as e:
+        return False, f"Error validating file: {e}"
+
+    if (not file_header or file_header[0] not in _PCAP_MAGIC_FIRST or
+            file_header not in _PCAP_MAGIC):
+        return _ERR_NOT_PCAP
+
+    return _OK
 
 
-def validate_replay_config(config):
+def validate_replay_config(
+        config: Dict) -> Tuple[bool, Optional[str], Optional[Dict]]:
     """
     Validate replay configuration parameters.
     
@@ -68,51 +236,46 @@ def validate_replay_config(config):
         tuple: (is_valid, error_message, sanitized_config)
     """
     if not isinstance(config, dict):
-        return False, "Configuration must be a dictionary", None
+        return _ERR_NOT_DICT
     
     sanitized = {}
-    
+
+    # Validate speed unit first: the whitelist test is the cheapest
+    # gate, and the unit decides the speed cap below. Fetched once.
+    speed_unit = config.get('speed_unit', 'multiplier')
+    if speed_unit not in _SPEED_UNITS:
+        return _ERR_SPEED_UNIT
+
+    sanitized['speed_unit'] = speed_unit
+
     # Validate speed
     speed = config.get('speed', Config.DEFAULT_REPLAY_SPEED)
-    speed_unit = config.get('speed_unit', 'multiplier')
-    
+
     try:
         speed = float(speed)
-        if speed <= 0:
-            return False, "Speed must be greater than 0", None
-        
-        # Apply different limits based on speed unit
-        if speed_unit == 'pps':
-            # For PPS, allow up to 1 million packets per second
-            if speed > 1000000:
-                return False, "PPS cannot exceed 1,000,000", None
-        else:
-            # For multiplier, use existing limit
-            if speed > Config.MAX_REPLAY_SPEED:
-                return False, f"Speed multiplier cannot exceed {Config.MAX_REPLAY_SPEED}x", None
-        
-        sanitized['speed'] = speed
     except (ValueError, TypeError):
-        return False, "Speed must be a valid number", None
+        return _ERR_SPEED_NAN
+
+    # One chained comparison against the unit's cap; the message is
+    # only worked out on the failure path
+    if not 0.0 < speed <= _SPEED_CAPS[speed_unit]:
+        if speed <= 0:
+            return _ERR_SPEED_NONPOS
+        return _SPEED_CAP_ERRORS[speed_unit]
+
+    sanitized['speed'] = speed
     
     # Validate interface
     interface = config.get('interface', '').strip()
     if not interface:
-        return False, "Network interface is required", None
-    
+        return _ERR_NO_IFACE
+
     # Basic interface name validation (alphanumeric, hyphens, underscores)
-    if not interface.replace('-', '').replace('_', '').replace('.', '').isalnum():
-        return False, "Invalid interface name", None
+    if not _IFACE_RE.match(interface):
+        return _ERR_BAD_IFACE
     
     sanitized['interface'] = interface
-    
-    # Validate speed unit (if provided)
-    speed_unit = config.get('speed_unit', 'multiplier')
-    if speed_unit not in ['multiplier', 'pps']:
-        return False, "Invalid speed unit. Must be 'multiplier' or 'pps'", None
-    
-    sanitized['speed_unit'] = speed_unit
-    
+
     # Validate continuous replay option
     continuous = config.get('continuous', False)
     if not isinstance(continuous, bool):
@@ -127,7 +290,7 @@ def validate_replay_config(config):
     return True, None, sanitized
 
 
-def sanitize_filename(filename):
+def sanitize_filename(filename: str) -> str:
     """
     Sanitize filename for safe storage.
     
@@ -139,12 +302,17 @@ def sanitize_filename(filename):
     """
     if not filename:
         return "unknown_file.pcap"
-    
+
+    # Fast path: most client filenames are already safe, so skip
+    # secure_filename's substitution and normalization passes
+    if _SAFE_FILENAME_RE.match(filename) and _has_allowed_ext(filename):
+        return filename
+
     # Use werkzeug's secure_filename and ensure extension
     safe_name = secure_filename(filename)
     
     # Ensure it has a valid extension
-    if not Config.allowed_file(safe_name):
+    if not _has_allowed_ext(safe_name):
         name_part = safe_name.rsplit('.', 1)[0] if '.' in safe_name else safe_name
         safe_name = f"{name_part}.pcap"
     
@@ -0,0 +1,21 @@
+"""WSGI entry point for production servers.
+
+Monkey-patches the standard library before anything else is imported so
+all blocking I/O becomes cooperative under gevent. Run with a single
+gevent worker so SocketIO rooms stay in one process:
+
+    gunicorn -k geventwebsocket.gunicorn.workers.GeventWebSocketWorker \
+        -w 1 -b 0.0.0.0:5000 wsgi:app
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import os  # noqa: E402
+
+from app import create_app  # noqa: E402
+
+app, socketio = create_app()
+
+# Ensure upload directory exists
+os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
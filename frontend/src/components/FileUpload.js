@@ -46,7 +46,23 @@ const FileUpload = ({ onFileUploaded, uploadedFile, setUploadedFile }) => {
         }
       });
 
-      const uploadData = response.data;
+      let uploadData = response.data;
+
+      // Analysis now runs in the background; poll until it finishes
+      if (uploadData.pcap_info?.state === 'pending') {
+        setUploading(false);
+        setAnalyzing(true);
+        const deadline = Date.now() + 300000; // 5 minutes
+        while (Date.now() < deadline) {
+          await new Promise((resolve) => setTimeout(resolve, 2000));
+          const poll = await apiService.getUploadAnalysis(uploadData.file_id);
+          if (poll.data.state !== 'pending') {
+            uploadData = { ...uploadData, pcap_info: poll.data.pcap_info };
+            break;
+          }
+        }
+      }
+
       setUploadedFile(uploadData);
       onFileUploaded(uploadData);
       setUploading(false);
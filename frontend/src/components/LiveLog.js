@@ -95,6 +95,19 @@ const LiveLog = () => {
       }
     });
 
+    newSocket.on('log_batch', (logEntries) => {
+      if (!isPaused) {
+        setLogs(prevLogs => {
+          const newLogs = [...prevLogs, ...logEntries];
+          // Keep only the last maxLogs entries
+          if (newLogs.length > maxLogs) {
+            return newLogs.slice(-maxLogs);
+          }
+          return newLogs;
+        });
+      }
+    });
+
     // Load initial log stats
     loadLogStats();
 
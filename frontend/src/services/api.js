@@ -67,6 +67,9 @@ export const apiService = {
   // Get upload status
   getUploadStatus: (fileId) => api.get(`/upload/status/${fileId}`),
 
+  // Get background PCAP analysis state/result
+  getUploadAnalysis: (fileId) => api.get(`/upload/analysis/${fileId}`),
+
   // Clean up uploaded file
   cleanupFile: (fileId) => api.delete(`/upload/cleanup/${fileId}`),
 